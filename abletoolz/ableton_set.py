@@ -1,27 +1,85 @@
 """Ableton set parsing."""
+import concurrent.futures
 import enum
 import functools
-import gzip
+import io
+import itertools
 import logging
 import os
 import pathlib
 import re
-import shutil
-import subprocess
 import sys
-import threading
-from typing import Callable, Dict, Generator, List, Optional, ParamSpec, Tuple, TypeVar
-from xml.etree import ElementTree as ET
+from typing import IO, Any, Callable, Dict, Generator, List, Optional, ParamSpec, Set, Tuple, TypeVar
 
 from abletoolz import color_tools, utils
 from abletoolz.ableton_track import AbletonTrack
-from abletoolz.misc import CB, RB, RST, STEREO_OUTPUTS, B, C, G, M, R, Y, get_element
-
-if sys.platform == "win32":
-    import win32_setctime
+from abletoolz.misc import (
+    CB,
+    ET,
+    LXML,
+    RB,
+    RST,
+    STEREO_OUTPUTS,
+    B,
+    C,
+    Element,
+    G,
+    M,
+    R,
+    Y,
+    get_element,
+    iter_tags,
+    stereo_display,
+    stereo_target,
+)
+from abletoolz.sample_databaser.create_db import SampleIndex
+
+try:
+    from isal import igzip as gzip
+
+    # Fastest isal level. On clip heavy set xml it's ~50x faster than zlib's max for output ~25% larger, level 3 is
+    # over twice as slow for under 1% smaller.
+    GZIP_COMPRESS_LEVEL = 1
+except ImportError:  # python-isal is optional, same api backed by the standard zlib.
+    import gzip  # type: ignore[no-redef]
+
+    # Instead of gzip's default 9, which takes ~4x as long for sets ~6% smaller.
+    GZIP_COMPRESS_LEVEL = 6
+
+try:
+    import rapidgzip
+except ImportError:  # rapidgzip is optional, only used to decompress large sets on multiple cores.
+    rapidgzip = None
 
 logger = logging.getLogger(__name__)
 
+VERSION_RE = re.compile(r"Ableton Live ([0-9]{1,2})\.([0-9]{1,3})[\.b]{0,1}([0-9]{1,3}){0,1}")
+# Filename decorations added by save_set, stripped before adding them again.
+BARS_BPM_RE = re.compile(r"_\d{1,3}bars_\d{1,3}\.\d{2}bpm")
+VERSION_PREFIX_RE = re.compile(r"\d{1,2}\.\d{1,3}\.[b\d]{1,5}_")
+
+POST_10_BPM_PATH = "LiveSet.MasterTrack.DeviceChain.Mixer.Tempo.Manual"
+PRE_10_BPM_PATH = "LiveSet.MasterTrack.DeviceChain.Mixer.Tempo.ArrangerAutomation.Events.FloatEvent"
+PRE_10_MASTER_CHAIN_BPM_PATH = "LiveSet.MasterTrack.MasterChain.Mixer.Tempo.ArrangerAutomation.Events.FloatEvent"
+
+# Builtin pack content, ableton usually finds these itself on set load.
+FACTORY_PACKS = ("/Resources/Builtin/Samples", "Ableton/Factory Packs")
+
+# Tags looked up across the whole set, collected together in one pass on first use.
+INDEXED_TAGS = ("CurrentEnd", "LaneHeight", "ViewStateSesstionTrackWidth", "TrackUnfolded", "PluginDesc", "SampleRef")
+
+# Gzip streams default to 8KB buffers, larger ones cut down on (de)compress calls for big sets.
+IO_BUFFER_SIZE = 256 * 1024
+# Compressed size from which rapidgzip's parallel decompression outweighs its thread spin up cost.
+PARALLEL_GZIP_MIN_SIZE = 8 * 1024 * 1024
+
+# Saved sets are compressed and written in the background while the next set is processed. Pool threads are joined
+# before the interpreter exits, so a write is never cut off halfway.
+WRITE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="write_set")
+# Each unfinished write keeps its whole parsed set in memory and the pool's queue is unbounded, so callers wait for the
+# oldest write before going past this many.
+MAX_PENDING_WRITES = 4
+
 
 class SetError(Exception):
     """Ableton set parse error."""
@@ -41,12 +99,35 @@ class SetOperatingSystem(enum.Enum):
 
 def version_supported(set_version: Tuple[int, int, int], supported_version: Tuple[int, int, int]) -> bool:
     """Check if set version is supported for method."""
-    for set_v, supported_v in zip(set_version, supported_version):
-        if set_v > supported_v:
-            return True
-        elif set_v < supported_v:
-            return False
-    return True
+    return set_version >= supported_version
+
+
+@functools.lru_cache(maxsize=4096)
+def has_project_info(directory: pathlib.Path) -> bool:
+    """Check if directory is a project root. Cached since sets processed together share most parent folders."""
+    return (directory / "Ableton Project Info").exists()
+
+
+@functools.lru_cache(maxsize=None)
+def windows_vst3_index() -> Dict[str, pathlib.Path]:
+    """Plugin file name to path for the Windows VST3 folder. Cached so it's only walked once for all sets."""
+    drive = os.environ["SYSTEMDRIVE"]
+    vst3_dir = pathlib.Path(rf"{drive}\Program Files\Common Files\VST3")
+    index: Dict[str, pathlib.Path] = {}
+    for vst3 in utils.walk_matching(vst3_dir, (".dll", ".vst3")):
+        index.setdefault(vst3.name, pathlib.Path(vst3.path))
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def vst_dir_index(directory: pathlib.Path) -> Dict[str, pathlib.Path]:
+    """Dll name, also without .32/.64, to path for a plugin folder. Cached so it's only walked once for all sets."""
+    index: Dict[str, pathlib.Path] = {}
+    for dll in utils.walk_matching(directory, (".dll",)):
+        dll_path = pathlib.Path(dll.path)
+        index.setdefault(dll.name, dll_path)
+        index.setdefault(dll.name.replace(".32", "").replace(".64", ""), dll_path)
+    return index
 
 
 P = ParamSpec("P")
@@ -85,19 +166,18 @@ def set_loaded(f: Callable[..., RT]) -> Callable[..., RT]:
     return wrapped_func
 
 
-def elements_equal(e1: ET.Element, e2: ET.Element) -> bool:
-    """Check if two xml.Etree roots are equivalent."""
-    if e1.tag != e2.tag:
-        return False
-    if e1.text != e2.text:
-        return False
-    if e1.tail != e2.tail:
-        return False
-    if e1.attrib != e2.attrib:
-        return False
-    if len(e1) != len(e2):
-        return False
-    return all(elements_equal(c1, c2) for c1, c2 in zip(e1, e2))
+def elements_equal(e1: Element, e2: Element) -> bool:
+    """Check if two xml.Etree roots are equivalent.
+
+    Walks both trees in document order instead of recursing, matching child counts at every element keeps the two
+    walks aligned.
+    """
+    for c1, c2 in zip(e1.iter(), e2.iter()):
+        if c1.tag != c2.tag or c1.text != c2.text or c1.tail != c2.tail or len(c1) != len(c2):
+            return False
+        if c1.attrib != c2.attrib:
+            return False
+    return True
 
 
 class AbletonSet(object):
@@ -108,7 +188,8 @@ class AbletonSet(object):
         self.name = pathlib_obj.name
         self.path = pathlib_obj
         self.tree = None
-        self.root: Optional[ET.Element] = None
+        self.root: Optional[Element] = None
+        self._tag_index: Optional[Dict[str, List[Element]]] = None
 
         # Parsed set variables.
         self.project_root_folder: Optional[pathlib.Path] = None  # Folder where Ableton Project Info resides.
@@ -128,7 +209,13 @@ class AbletonSet(object):
         self.set_os: SetOperatingSystem = SetOperatingSystem.UNSET
         self.missing_absolute_samples: List[pathlib.Path] = []
         self.missing_relative_samples: List[pathlib.Path] = []
+        self._missing_absolute_set: Set[pathlib.Path] = set()
+        self._missing_relative_set: Set[pathlib.Path] = set()
+        self._collect_dirs: Set[str] = set()  # Project folders already created for collected samples.
+        # Collected sample destination: (source, size), copied together at the end of fix_samples.
+        self._pending_copies: Dict[str, Tuple[pathlib.Path, Optional[int]]] = {}
         self.found_vst_dirs: List[pathlib.Path] = []
+        self._found_vst_dirs_set: Set[pathlib.Path] = set()
         self.last_elem = None
         self.key = None
 
@@ -145,6 +232,8 @@ class AbletonSet(object):
 
         Currently unused.
         """
+        import subprocess  # Only needed here, keep it out of startup.
+
         if sys.platform == "win32":
             subprocess.Popen(f'explorer /select, "{self.path}"')
         elif sys.platform == "darwin":
@@ -153,33 +242,23 @@ class AbletonSet(object):
     @set_loaded
     def load_version(self) -> None:
         """Load version."""
-        assert self.root  # Shut mypy up since decorator checks this.
+        assert self.root is not None  # Shut mypy up since decorator checks this.
         self.version = self.root.get("Creator")
         if not isinstance(self.version, str):
             raise SetError("Couldn't parse Creator from set.")
-        parsed = re.findall(
-            r"Ableton Live ([0-9]{1,2})\.([0-9]{1,3})[\.b]{0,1}([0-9]{1,3}){0,1}",
-            self.version,
-        )
-        if not parsed:
+        match = VERSION_RE.search(self.version)
+        if match is None:
             raise SetError("Couldn't parse set version!")
-        parsed = [int(x) if x.isdigit() else x for x in parsed[0] if x != ""]
-        if len(parsed) == 3:
-            major, minor, patch = parsed
-        elif len(parsed) == 2:
-            major, minor = parsed
-            patch = 0
-        else:
-            raise SetError(f"Could not parse version from: {self.version}")
-        self.version_tuple = major, minor, patch
+        major, minor, patch = match.groups()
+        self.version_tuple = int(major), int(minor), int(patch) if patch else 0
         logger.info("%sSet version: %s%s", B, M, self.version)
         if "b" in self.version.split()[-1]:
             logger.warning("%sSet is from a beta version, some commands might not work properly!", Y)
 
     def parse(self) -> bool:
         """Uncompresses ableton set and loads into element tree."""
-        with open(self.path, "rb") as fd:
-            first_two_bytes = fd.read(2)
+        with open(self.path, "rb") as raw:
+            first_two_bytes = raw.read(2)
             if first_two_bytes == b"\xab\x1e":  # yes, it spells able :P
                 logger.error("%s%sIs pre Ableton 8.2.x which is unsupported.", R, self.path)
                 return False
@@ -188,14 +267,38 @@ class AbletonSet(object):
                     "%s%sFile is not .als or is an older format that doesn't use gzip!, cannot open...", R, self.path
                 )
                 return False
-        self.get_file_times()
-        with gzip.open(self.path, "r") as fd:
-            data = fd.read().decode("utf-8")
-            if not data:
-                logger.error("%sError loading data %s!", R, self.path)
-                return False
-            self.root = ET.fromstring(data)
-            return True
+            raw.seek(0)
+            self.get_file_times()
+            with self._open_xml(raw) as fd:
+                # Large sets easily pass libxml2's default text node and depth limits.
+                parser = ET.XMLParser(huge_tree=True) if LXML else None
+                try:
+                    self.root = ET.parse(fd, parser).getroot()
+                except ET.ParseError as e:
+                    logger.error("%sError loading data %s! %s", R, self.path, e)
+                    return False
+        self._tag_index = None
+        return True
+
+    def _open_xml(self, raw: IO[bytes]) -> IO[bytes]:
+        """Open the set's decompressed xml, reusing the already open file unless rapidgzip needs the path."""
+        if rapidgzip is not None and os.fstat(raw.fileno()).st_size >= PARALLEL_GZIP_MIN_SIZE:
+            return rapidgzip.open(str(self.path), parallelization=os.cpu_count())
+        return io.BufferedReader(gzip.open(raw, "rb"), buffer_size=IO_BUFFER_SIZE)
+
+    def elements(self, tag: str) -> List[Element]:
+        """Get all elements with one of the INDEXED_TAGS, the tree is only walked once for all of them."""
+        if self._tag_index is None:
+            assert self.root is not None  # Shut mypy up.
+            self._tag_index = {indexed_tag: [] for indexed_tag in INDEXED_TAGS}
+            for element in iter_tags(self.root, INDEXED_TAGS):
+                self._tag_index[element.tag].append(element)
+        return self._tag_index[tag]
+
+    def _set_values(self, tag: str, value: str) -> None:
+        """Set the Value attribute of every indexed element with tag."""
+        for element in self.elements(tag):
+            element.set("Value", value)
 
     def find_project_root_folder(self) -> Optional[pathlib.Path]:
         """Find project root folder for set."""
@@ -208,7 +311,7 @@ class AbletonSet(object):
             if i > max_folder_search_depth:
                 logger.warning("%sReached maximum search depth, exiting..", R)
                 break
-            elif pathlib.Path(current_dir / "Ableton Project Info").exists():
+            elif has_project_info(current_dir):
                 self.project_root_folder = current_dir
                 logger.debug("%sProject root folder: %s", C, current_dir)
                 return self.project_root_folder
@@ -216,21 +319,26 @@ class AbletonSet(object):
         return None
 
     def generate_xml(self) -> bytes:
-        """Add header and footer to xml data."""
+        """Add header and footer to xml data. Prefer write_xml, which doesn't hold the whole document in memory."""
+        buffer = io.BytesIO()
+        self.write_xml(buffer)
+        return buffer.getvalue()
+
+    def write_xml(self, fd: IO[bytes]) -> None:
+        """Serialize header, xml and footer straight into a binary file object."""
         if self.root is None:
             raise SetError("Set is not loaded!")
-        header = '<?xml version="1.0" encoding="UTF-8"?>\n'.encode("utf-8")
-        footer = "\n".encode("utf-8")
-        xml_output = ET.tostring(self.root, encoding="utf-8")
-        return header + xml_output + footer
+        fd.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        ET.ElementTree(self.root).write(fd, encoding="utf-8", xml_declaration=False)
+        fd.write(b"\n")
 
     def save_xml(self) -> None:
         """Save set XML."""
         xml_file = self.path.parent / (self.path.stem + ".xml")
         if xml_file.exists():
             utils.create_backup(xml_file)
-        with xml_file as fd:
-            fd.write_bytes(self.generate_xml())
+        with xml_file.open("wb", buffering=IO_BUFFER_SIZE) as fd:
+            self.write_xml(fd)
         logger.info("%sSaved xml to %s", G, xml_file)
 
     def get_file_times(self) -> None:
@@ -254,11 +362,21 @@ class AbletonSet(object):
             return
         os.utime(self.path, (self.last_modification_time, self.last_modification_time))
         if sys.platform == "win32":
+            import win32_setctime  # Windows only dependency, only needed when saving.
+
             win32_setctime.setctime(self.path, self.creation_time)
-        elif sys.platform == "darwin":
-            date = utils.format_date(self.creation_time)
-            path = str(pathlib_obj).replace(" ", r"\ ")
-            os.system(f'SetFile -d "{date}" {path} >/dev/null')
+        elif sys.platform == "darwin" and not utils.set_mac_creation_time(pathlib_obj, self.creation_time):
+            import subprocess  # Only needed for the SetFile fallback, keep it out of startup.
+
+            # Argument list instead of a shell command, so no quoting of the path is needed.
+            try:
+                subprocess.run(
+                    ["SetFile", "-d", utils.format_date(self.creation_time), str(pathlib_obj)],
+                    stdout=subprocess.DEVNULL,
+                    check=False,
+                )
+            except OSError as e:
+                logger.warning("%sCouldn't restore creation time with SetFile: %s", Y, e)
         logger.debug(
             "%sRestored set creation and modification times: %s, %s",
             G,
@@ -268,38 +386,42 @@ class AbletonSet(object):
 
     def write_set(self) -> None:
         """Recompresses set to gzip. Used in thread to help prevent file getting corrupted mid write."""
-        with gzip.open(self.path, "wb") as fd:
-            fd.write(self.generate_xml())
+        with gzip.open(self.path, "wb", compresslevel=GZIP_COMPRESS_LEVEL) as gz:
+            with io.BufferedWriter(gz, buffer_size=IO_BUFFER_SIZE) as fd:
+                self.write_xml(fd)
         logger.info("%sSaved set to %s", G, self.path)
         self.restore_file_times(self.path)
 
-    def save_set(self, append_bars_bpm: bool = False, prepend_version: bool = False) -> None:
+    def save_set(
+        self, append_bars_bpm: bool = False, prepend_version: bool = False
+    ) -> "concurrent.futures.Future[None]":
         """Save set to disk with optional filename modifications.
 
         This function saves the current set to disk, first creating a backup of the original file.
         It optionally appends the number of bars and BPM to the filename, and/or prepends the version number.
-        The actual writing of the set to disk is performed in a separate thread.
+        The actual writing of the set to disk is performed in WRITE_POOL, which is not waited on so the next
+        set can be processed while this one compresses.
 
         Args:
             append_bars_bpm: If True, append the number of bars and BPM to the filename.
             prepend_version: If True, prepend the version number to the filename.
+
+        Returns:
+            future for the write, its result is available once the set is on disk.
         """
         utils.create_backup(self.path)
         if append_bars_bpm:
-            cleaned_name = re.sub(r"_\d{1,3}bars_\d{1,3}\.\d{2}bpm", "", self.path.stem)
+            cleaned_name = BARS_BPM_RE.sub("", self.path.stem)
             new_filename = cleaned_name + f"_{self.furthest_bar}bars_{self.bpm:.2f}bpm.als"
             self.path = pathlib.Path(self.path.parent / new_filename)
             logger.debug("%sAppending bars and bpm, new set name: %s.als", M, self.path.stem)
 
         if self.version_tuple and prepend_version:
             version_string = f"{self.version_tuple[0]}.{self.version_tuple[1]}.{self.version_tuple[2]}_"
-            cleaned_name = re.sub(r"\d{1,2}\.\d{1,3}\.[b\d]{1,5}_", "", self.path.stem)
+            cleaned_name = VERSION_PREFIX_RE.sub("", self.path.stem)
             self.path = self.path.parent / (version_string + cleaned_name + self.path.suffix)
 
-        # Create non daemon thread so that it is not forcibly killed if parent process is killed.
-        thread = threading.Thread(target=self.write_set)
-        thread.start()
-        thread.join()
+        return WRITE_POOL.submit(self.write_set)
 
     # Data parsing functions.
     @above_version(supported_version=(8, 0, 0))
@@ -317,8 +439,10 @@ class AbletonSet(object):
     def find_furthest_bar(self) -> int:
         """Find the max of the longest clip or furthest bar something is in Arrangement."""
         assert self.root is not None  # Shut mypy up.
-        current_end_times = [int(float(end_times.get("Value", 0))) for end_times in self.root.iter("CurrentEnd")]
-        self.furthest_bar = int(max(current_end_times) / 4) if current_end_times else 0
+        # Compare as floats, truncating is monotonic so only the max needs casting.
+        end_times = (float(end_time.get("Value", 0)) for end_time in self.elements("CurrentEnd"))
+        furthest_end = int(max(end_times, default=0))
+        self.furthest_bar = int(furthest_end / 4)
         return self.furthest_bar
 
     @above_version(supported_version=(8, 2, 0))
@@ -326,14 +450,13 @@ class AbletonSet(object):
         """Get bpm from Ableton Live set XML."""
         if self.version_tuple is None:
             raise SetError("Set version is not parsed!")
-        post_10_bpm = "LiveSet.MasterTrack.DeviceChain.Mixer.Tempo.Manual"
-        pre_10_bpm = "LiveSet.MasterTrack.MasterChain.Mixer.Tempo.ArrangerAutomation.Events.FloatEvent"
-        pre_10_bpm = "LiveSet.MasterTrack.DeviceChain.Mixer.Tempo.ArrangerAutomation.Events.FloatEvent"
         major, minor, _ = self.version_tuple
         if major >= 10 or major >= 9 and minor >= 7:
-            bpm_elem = get_element(self.root, post_10_bpm, attribute="Value", silent_error=True)
+            bpm_elem = get_element(self.root, POST_10_BPM_PATH, attribute="Value", silent_error=True)
         else:
-            bpm_elem = get_element(self.root, pre_10_bpm, attribute="Value")
+            bpm_elem = get_element(self.root, PRE_10_BPM_PATH, attribute="Value", silent_error=True)
+            if bpm_elem is None:  # ableton 8 sets use "MasterChain" for master track.
+                bpm_elem = get_element(self.root, PRE_10_MASTER_CHAIN_BPM_PATH, attribute="Value")
         self.bpm = round(float(bpm_elem), 6)
         return self.bpm
 
@@ -358,8 +481,7 @@ class AbletonSet(object):
         """In Arrangement view, sets all track lanes/automation lanes to specified height."""
         assert self.root is not None  # Shutup mypy, not possible at runtime.
         height = min(425, (max(17, height)))  # Clamp to valid range.
-        for el in self.root.iter("LaneHeight"):
-            el.set("Value", str(height))
+        self._set_values("LaneHeight", str(height))
         logger.info("%sSet track heights to %s.", G, height)
 
     @set_loaded
@@ -368,68 +490,45 @@ class AbletonSet(object):
         assert self.root is not None  # Shutup mypy.
         width = min(264, (max(17, width)))  # Clamp to valid range.
         # Sesstion is how it's named in the set, not a typo!
-        for el in self.root.iter("ViewStateSesstionTrackWidth"):
-            el.set("Value", str(width))
+        self._set_values("ViewStateSesstionTrackWidth", str(width))
         logger.info("%sSet track widths to %s.", G, width)
 
     @set_loaded
     def fold_tracks(self) -> None:
         """Fold all tracks."""
         assert self.root is not None  # Shutup mypy.
-        for el in self.root.iter("TrackUnfolded"):
-            el.set("Value", "false")
+        self._set_values("TrackUnfolded", "false")
         logger.info("%sFolded all tracks.", G)
 
     @set_loaded
     def unfold_tracks(self) -> None:
         """Unfold all tracks."""
         assert self.root is not None  # Shutup mypy, not possible at runtime.
-        for el in self.root.iter("TrackUnfolded"):
-            el.set("Value", "true")
+        self._set_values("TrackUnfolded", "true")
         logger.info("%sUnfolded all tracks.", G)
 
     @above_version(supported_version=(8, 2, 0))
     def set_audio_output(self, output_number: int, element_string: str) -> None:
         """Set audio output."""
-        if output_number not in STEREO_OUTPUTS:
-            raise ValueError(f"{R}Output number invalid!. Available options: \n{STEREO_OUTPUTS}{RST}")
-        output_obj = STEREO_OUTPUTS[output_number]
-        out_target_element = get_element(
-            self.root,
-            f"LiveSet.{element_string}.DeviceChain.AudioOutputRouting.Target",
-            silent_error=True,
+        if not 1 <= output_number <= len(STEREO_OUTPUTS):
+            options = ", ".join(f"{i}: {display}" for i, (_, display) in enumerate(STEREO_OUTPUTS, 1))
+            raise ValueError(f"{R}Output number invalid!. Available options: \n{options}{RST}")
+        routing_element = get_element(
+            self.root, f"LiveSet.{element_string}.DeviceChain.AudioOutputRouting", silent_error=True
         )
-        if not isinstance(out_target_element, ET.Element):
-            out_target_element = get_element(  # ableton 8 sets use "MasterChain" for master track.
-                self.root,
-                f"LiveSet.{element_string}.MasterChain.AudioOutputRouting.Target",
-            )
-            lower_display_string_element = get_element(
-                self.root,
-                f"LiveSet.{element_string}.MasterChain.AudioOutputRouting.LowerDisplayString",
-            )
-        else:
-            lower_display_string_element = get_element(
-                self.root,
-                f"LiveSet.{element_string}.DeviceChain.AudioOutputRouting.LowerDisplayString",
-            )
-        out_target_element.set("Value", output_obj["target"])
-        lower_display_string_element.set("Value", output_obj["lower_display_string"])
-        logger.info("%sSet %s to %s", G, element_string, output_obj["lower_display_string"])
+        if routing_element is None:  # ableton 8 sets use "MasterChain" for master track.
+            routing_element = get_element(self.root, f"LiveSet.{element_string}.MasterChain.AudioOutputRouting")
+        get_element(routing_element, "Target").set("Value", stereo_target(output_number))
+        get_element(routing_element, "LowerDisplayString").set("Value", stereo_display(output_number))
+        logger.info("%sSet %s to %s", G, element_string, stereo_display(output_number))
 
     def _parse_hex_path(self, text: str) -> Optional[str]:
         """Take raw hex string from XML entry and parses."""
         if not text:
             return None
-        # Strip new lines and tabs from raw text to have one long hex string.
-        abs_hash_path = text.replace("\t", "").replace("\n", "")
-        byte_data = bytearray.fromhex(abs_hash_path)
-        if byte_data[0:3] == b"\x00" * 3:  # Header only on mac projects.
-            self.set_os = SetOperatingSystem.MAC_OS
-            return utils.parse_mac_data(byte_data, abs_hash_path)
-        else:
-            self.set_os = SetOperatingSystem.WINDOWS_OS
-            return utils.parse_windows_data(byte_data, abs_hash_path)
+        is_mac, path = utils.decode_hex_path(text)
+        self.set_os = SetOperatingSystem.MAC_OS if is_mac else SetOperatingSystem.WINDOWS_OS
+        return path
 
     def path_separator_type(self, path_str: str) -> str:
         """Get OS path string separator."""
@@ -442,18 +541,16 @@ class AbletonSet(object):
             raise ValueError(f"Couldn't parse OS path type! {path_str}")
 
     def search_plugins(self, plugin_name: str) -> Optional[pathlib.Path]:
-        """Search for plugins and add them to self.found_vst_dirs."""
+        """Search for plugins in the VST3 folder and self.found_vst_dirs.
+
+        Each folder is only walked once per process, later searches are dict lookups.
+        """
         if sys.platform == "win32":
-            drive = os.environ["SYSTEMDRIVE"]
-            _WINDOWS_VST3 = pathlib.Path(rf"{drive}\Program Files\Common Files\VST3")
-            vst3_plugins = list(_WINDOWS_VST3.rglob("*.dll")) + list(_WINDOWS_VST3.rglob("*.vst3"))
-            for vst3 in vst3_plugins:
-                if plugin_name == vst3.name:
-                    return vst3
+            if plugin_name in (vst3_index := windows_vst3_index()):
+                return vst3_index[plugin_name]
             for directory in self.found_vst_dirs:
-                for dll in directory.rglob("*.dll"):
-                    if plugin_name == dll.name or plugin_name == dll.name.replace(".32", "").replace(".64", ""):
-                        return dll
+                if plugin_name in (dir_index := vst_dir_index(directory)):
+                    return dir_index[plugin_name]
             return None
         else:
             # TODO: Implement MacOS VST3 logic
@@ -462,26 +559,31 @@ class AbletonSet(object):
 
     # Plugin related functions.
     def parse_vst_element(
-        self, vst_element: ET.Element
+        self, vst_element: Element
     ) -> Tuple[Optional[pathlib.Path], Optional[str], Optional[pathlib.Path]]:
         """Parse out VST element from vst xtree."""
         for plugin_path in ["Dir", "Path"]:
-            path_results = vst_element.findall(f".//{plugin_path}")
-            if len(path_results):
+            # Only the first match is used, find stops there instead of collecting every match like findall.
+            path_element = vst_element.find(f".//{plugin_path}")
+            if path_element is not None:
                 if plugin_path == "Path":
-                    if (full_path := path_results[0].get("Value")) is None:
-                        logger.error("Couldn't get Path for %s", path_results[0])
+                    if (full_path := path_element.get("Value")) is None:
+                        logger.error("Couldn't get Path for %s", path_element)
                         continue
-                    if not "/" in full_path and not "\\" in full_path:
+                    # Same preference as path_separator_type, checked once here since a bare name means a search.
+                    if "\\" in full_path:
+                        path_separator = "\\"
+                    elif "/" in full_path:
+                        path_separator = "/"
+                    else:
                         if search_result := self.search_plugins(full_path):
                             return None, search_result.name, search_result
                         return None, full_path, None
-                    path_separator = self.path_separator_type(full_path)
-                    name = full_path.split(path_separator)[-1]
+                    name = full_path.rsplit(path_separator, 1)[-1]
                     return pathlib.Path(full_path), name, None
                 elif plugin_path == "Dir":
-                    if (dir_bin := path_results[0].find("Data")) is None:
-                        logger.error("Couldn't get Path for %s", path_results[0])
+                    if (dir_bin := path_element.find("Data")) is None:
+                        logger.error("Couldn't get Path for %s", path_element)
                         continue
                     if (text := dir_bin.text) is None:
                         continue
@@ -501,17 +603,27 @@ class AbletonSet(object):
         logger.error("%sCouldn't parse plugin!", R)
         return None, None, None
 
+    def _add_vst_dir(self, vst_dir: pathlib.Path) -> None:
+        """Add folder to self.found_vst_dirs, keeping insertion order without duplicates."""
+        if vst_dir not in self._found_vst_dirs_set:
+            self._found_vst_dirs_set.add(vst_dir)
+            self.found_vst_dirs.append(vst_dir)
+
     def list_plugins(self, vst_dirs: List[pathlib.Path]) -> List[pathlib.Path]:
         """Iterates through all plugin references and checks paths for VSTs."""
-        self.found_vst_dirs.extend(vst_dirs)
-        for plugin_element in self.root.iter("PluginDesc"):
+        for vst_dir in vst_dirs:
+            self._add_vst_dir(vst_dir)
+        for plugin_element in self.elements("PluginDesc"):
             self.last_elem = plugin_element
-            for vst_element in plugin_element.iter("VstPluginInfo"):
-                full_path, name, potential = self.parse_vst_element(vst_element)
-                exists = True if full_path and full_path.exists() else False
-                if exists and full_path.parent not in self.found_vst_dirs:
-                    self.found_vst_dirs.append(full_path.parent)
-                elif not exists:
+            for info_element in iter_tags(plugin_element, ("VstPluginInfo", "AuPluginInfo")):
+                if info_element.tag == "AuPluginInfo":
+                    self._log_au_plugin(plugin_element, info_element)
+                    continue
+                full_path, name, potential = self.parse_vst_element(info_element)
+                exists = full_path is not None and os.path.exists(full_path)
+                if exists:
+                    self._add_vst_dir(full_path.parent)
+                else:
                     # Did not find plugin in saved path, try to search
                     potential = self.search_plugins(name)
                 color = G if exists else R
@@ -522,24 +634,27 @@ class AbletonSet(object):
                 )
                 if potential:
                     logger.info("%s\tPotential alternative path for %s found: %s%s", CB, name, M, potential)
-            for au_element in plugin_element.iter("AuPluginInfo"):
-                name = au_element.find("Name").get("Value")
-                manufacturer = get_element(plugin_element, "AuPluginInfo.Manufacturer", attribute="Value")
-                logger.info(
-                    "%sMac OS Audio Units are not saved with paths. Plugin %s: %s cannot be verified.",
-                    M,
-                    manufacturer,
-                    name,
-                )
-                # TODO figure out how to match different name from components installed to stored set plugin.
-                # au_components = pathlib.Path('/Library/Audio/Plug-Ins/Components').rglob('*.component')
         return self.found_vst_dirs
 
+    @staticmethod
+    def _log_au_plugin(plugin_element: Element, au_element: Element) -> None:
+        """Audio units only store component names, log that they can't be checked."""
+        name = au_element.find("Name").get("Value")
+        manufacturer = get_element(plugin_element, "AuPluginInfo.Manufacturer", attribute="Value")
+        logger.info(
+            "%sMac OS Audio Units are not saved with paths. Plugin %s: %s cannot be verified.",
+            M,
+            manufacturer,
+            name,
+        )
+        # TODO figure out how to match different name from components installed to stored set plugin.
+        # au_components = pathlib.Path('/Library/Audio/Plug-Ins/Components').rglob('*.component')
+
     def _list_samples(self) -> None:
         """Post Ableton 11 sample parser. Format changed from binary encoded paths to simple strings for all OSes."""
         missing_samples = 0
-        for parsed in self._iterate_samples():
-            if parsed.absolute_exists or parsed.relative_exists:
+        for parsed, found in self._check_samples():
+            if found:
                 # Sample will load in ableton, no need to do anything.
                 logger.debug(
                     "%sSample %s found: Relative %s, Absolute %s",
@@ -571,16 +686,20 @@ class AbletonSet(object):
         verbose: bool,
         saved_filesize: int,
     ) -> bool:
-        absolute_found = absolute_path is not None and absolute_path.exists()
-        relative_found = relative_path is not None and relative_path.exists()
+        absolute_stat = utils.stat_or_none(absolute_path)
+        relative_stat = utils.stat_or_none(relative_path)
+        absolute_found = absolute_stat is not None
+        relative_found = relative_stat is not None
         if not absolute_found and not relative_found:
-            if absolute_path and absolute_path not in self.missing_absolute_samples:
+            if absolute_path and absolute_path not in self._missing_absolute_set:
+                self._missing_absolute_set.add(absolute_path)
                 self.missing_absolute_samples.append(absolute_path)
-            if relative_path and relative_path not in self.missing_relative_samples:
+            if relative_path and relative_path not in self._missing_relative_set:
+                self._missing_relative_set.add(relative_path)
                 self.missing_relative_samples.append(relative_path)
             return False
-        if absolute_found and absolute_path is not None:
-            local_filesize = absolute_path.stat().st_size
+        if absolute_stat is not None:
+            local_filesize = absolute_stat.st_size
             if verbose:
                 size_match = saved_filesize == local_filesize
                 logger.info(
@@ -592,8 +711,8 @@ class AbletonSet(object):
                     G if size_match else R,
                     size_match,
                 )
-        if relative_found and relative_path is not None:
-            local_filesize = relative_path.stat().st_size
+        if relative_stat is not None:
+            local_filesize = relative_stat.st_size
             size_match = saved_filesize == local_filesize
             if verbose:
                 logger.info(
@@ -634,42 +753,51 @@ class AbletonSet(object):
             for parsed in self.sample_list:
                 yield parsed
             return
-        for sample_ref in self.root.iter("SampleRef"):
+        for sample_ref in self.elements("SampleRef"):
             parsed = utils.SampleRef.from_element(sample_ref, self.version_tuple, self.project_root_folder)
             self.sample_list.append(parsed)
             yield parsed
         return
 
-    def fix_samples(self, db: Dict[str, Dict[str, str]], collect_and_save: bool = False, force: bool = False) -> bool:
+    def _check_samples(self) -> List[Tuple[utils.SampleRef, bool]]:
+        """Pair each sample reference with whether ableton can load it, all paths are checked up front in parallel."""
+        samples = list(self._iterate_samples())
+        paths = [path for parsed in samples for path in (parsed.absolute, parsed.relative_full_path)]
+        exists = utils.paths_exist(paths)
+        # Absolute and relative results alternate, either one existing means ableton finds the sample.
+        return [(parsed, exists[2 * i] or exists[2 * i + 1]) for i, parsed in enumerate(samples)]
+
+    def fix_samples(self, db: SampleIndex, collect_and_save: bool = False, force: bool = False) -> bool:
         """Fix broken sample paths.
 
         Args:
-            db: database loaded from json.
+            db: database loaded from json, indexed for matching.
             collect_and_save: copy any found samples into the project folder, the same as ableton's collect
                 and save
             force: used with collect_and_save. When the same name sample is found in the project, force replace
                 it if the project's current file is a different file size.
         """
         self.find_project_root_folder()
-        found_samples: Dict[str, Dict[str, str]] = {}
+        found_samples: Dict[str, Dict[str, Dict[str, Any]]] = {}  # Sample name: {path: db info}
         missing_samples = 0
         fixed_samples = 0
         skip_search = False
-        for parsed in self._iterate_samples():
-            if parsed.absolute_exists or parsed.relative_exists:
+        for parsed, found in self._check_samples():
+            if found or self._is_collected(parsed):
                 # Sample will load in ableton, no need to do anything.
                 continue
             missing_samples += 1
 
             # Skip builtin pack content for now. Can revisit this later but these samples probably will fix
             # automatically in ableton on set load.
-            factory_packs = ["/Resources/Builtin/Samples", "Ableton/Factory Packs"]
-            if any([x in str(parsed.absolute.parent) for x in factory_packs]):
+            if parsed.absolute is not None and any(x in str(parsed.absolute.parent) for x in FACTORY_PACKS):
                 logger.debug("%sSkipping builtin pack content: %s", Y, parsed.absolute)
                 continue
 
             # There's often the same sample referenced many times in the same set, check previous found first.
-            for smp_path, smp_info in found_samples.items():
+            for smp_path, smp_info in found_samples.get(parsed.name, {}).items():
+                if not self._sample_matches(parsed, smp_info):
+                    continue
                 if self._fix_sample(collect_and_save, parsed, smp_info, smp_path, found_samples, force):
                     fixed_samples += 1
                     skip_search = True
@@ -677,8 +805,7 @@ class AbletonSet(object):
             if skip_search:
                 skip_search = False
                 continue
-            # Iterating through hashes is extremely fast :D
-            for smp_path, smp_info in db.items():
+            for smp_path, smp_info in db.matches(parsed.name, parsed.size, parsed.last_modified):
                 if self._fix_sample(collect_and_save, parsed, smp_info, smp_path, found_samples, force):
                     fixed_samples += 1
                     break
@@ -687,6 +814,11 @@ class AbletonSet(object):
                     "%sCould not find sample for %s\n%s\n%s", Y, parsed.name, parsed.absolute, parsed.relative
                 )
 
+        if self._pending_copies:
+            logger.info("%sCopying %s sample(s) into project...", M, len(self._pending_copies))
+            utils.copy_files({dest: src for dest, (src, _) in self._pending_copies.items()})
+            self._pending_copies.clear()
+
         logger.info(
             "%sOrignal missing sample count: %s, Samples fixed: %s, Couldn't fix: %s",
             G if fixed_samples == missing_samples else R,
@@ -695,54 +827,64 @@ class AbletonSet(object):
             missing_samples - fixed_samples,
         )
 
+    def _is_collected(self, parsed: utils.SampleRef) -> bool:
+        """Whether the sample points at a file already collected into the project earlier in fix_samples.
+
+        Paths are all checked before any sample is collected, so later references to the same sample only find it here.
+        """
+        paths = (parsed.absolute, parsed.relative_full_path)
+        return any(path is not None and str(path) in self._pending_copies for path in paths)
+
+    @staticmethod
+    def _sample_matches(parsed: utils.SampleRef, smp_info: Dict[str, Any]) -> bool:
+        """Same matching as SampleIndex.matches, for samples already found earlier in the set."""
+        size_match = parsed.size and smp_info.get("size") == parsed.size
+        modified_match = parsed.last_modified and parsed.last_modified == smp_info.get("last_modified")
+        return bool(size_match or modified_match)
+
     def _fix_sample(
         self,
         collect_and_save: bool,
         parsed: utils.SampleRef,
-        smp_info: Dict[str, str],
+        smp_info: Dict[str, Any],
         smp_path: str,
-        found_samples: Dict[str, Dict[str, str]],
+        found_samples: Dict[str, Dict[str, Dict[str, Any]]],
         force: bool,
     ) -> bool:
-        """Attempt to fix sample if matches DB entry.
-
-        size is not always stored in ableton sets unfortunately, but we do usually have last_modified.
-        This is not perfect, but the probability of a file name matching and it's last modification time
-        matching and being a false positive are quite low.
-        """
-        if smp_info.get("name") != parsed.name:
-            return False
-        size_match = parsed.size and smp_info.get("size") == parsed.size
-        modified_match = parsed.last_modified and parsed.last_modified == int(smp_info.get("last_modified"))
-        if not size_match and not modified_match:
-            return False
-
+        """Fix sample using matching DB entry."""
         logger.debug("\n\n%sFound potential match %s, \n[%s]\n%s%s", G, smp_path, smp_info, M, parsed)
-        found_samples[smp_path] = smp_info
+        found_samples.setdefault(parsed.name, {})[smp_path] = smp_info
         replacement_sample = pathlib.Path(smp_path)
 
         if collect_and_save and self.project_root_folder:
-            # Relative type 3 is collected and saved, 1 is absolute path.
-            relative_type = parsed.get_relative_type()
-            if relative_type == 3:
-                rel_path = str(parsed.get_relative_value())
+            # Relative type 3 is collected and saved, 1 is absolute path. Only read once a match is being collected.
+            rel_path = str(parsed.get_relative_value()) if parsed.get_relative_type() == 3 else "Samples/Imported"
+            collect_dir = os.path.join(self.project_root_folder, rel_path)
+            if rel_path not in self._collect_dirs:
+                os.makedirs(collect_dir, exist_ok=True)
+                self._collect_dirs.add(rel_path)
+
+            # Normalized so it compares equal to the sample's own paths in _is_collected.
+            copied_sample = os.path.normpath(os.path.join(collect_dir, smp_info["name"]))
+            pending = self._pending_copies.get(copied_sample)
+            if pending is not None:
+                # Reuse a queued copy of the same source, a different source with the same name clashes unless both
+                # database sizes are known and equal.
+                new_size = smp_info.get("size")
+                clash = pending[0] != replacement_sample and (new_size is None or pending[1] != new_size)
+            elif (existing := utils.stat_or_none(copied_sample)) is not None:
+                clash = existing.st_size != parsed.size
             else:
-                rel_path = "Samples/Imported"
-            (self.project_root_folder / rel_path).mkdir(parents=True, exist_ok=True)
-
-            copied_sample = self.project_root_folder / rel_path / smp_info.get("name")
-            if copied_sample.exists() and copied_sample.stat().st_size != parsed.size:
+                clash = False
+                self._pending_copies[copied_sample] = (replacement_sample, smp_info.get("size"))
+            if clash:
                 logger.error(
                     "%sCannot copy sample %s, would replace existing one in project with " "same name! Skipping...",
                     R,
                     copied_sample,
                 )
                 return False
-            elif copied_sample.exists() and copied_sample.stat().st_size == parsed.size:
-                pass
-            else:
-                shutil.copy(replacement_sample, copied_sample)
-            parsed.set_relative(f"{rel_path}/{copied_sample.name}")
+            parsed.set_relative(f"{rel_path}/{smp_info['name']}")
             parsed.set_relative_type(3)
         elif collect_and_save and not self.project_root_folder:
             logger.warning(
@@ -761,15 +903,16 @@ class AbletonSet(object):
             self.load_tracks()
         for clr_ind, track in zip(color_tools.create_gradient_ableton(len(self.tracks)), self.tracks):
             track.color = clr_ind
-
-            clipview_clr_elements = list(track.clip_clipview_colors())
+            clipview_clr_elements = track.clipview_color_elements
+            arangement_clr_elements = track.arrangement_color_elements
             clip_view_gradient = color_tools.create_gradient_ableton(len(clipview_clr_elements), starting_index=clr_ind)
-            for sub_ind, clip_clr_ele in zip(clip_view_gradient, clipview_clr_elements):
-                clip_clr_ele.set("Value", str(sub_ind))
-
-            arangement_clr_elements = list(track.clip_arangement_colors())
-            clip_view_gradient = color_tools.create_gradient_ableton(
+            arangement_gradient = color_tools.create_gradient_ableton(
                 len(arangement_clr_elements), starting_index=clr_ind
             )
-            for sub_ind, clip_clr_ele in zip(clip_view_gradient, arangement_clr_elements):
-                clip_clr_ele.set("Value", str(sub_ind))
+            for clip_clr_ele, arangement_clr_ele, sub_ind, arangement_ind in itertools.zip_longest(
+                clipview_clr_elements, arangement_clr_elements, clip_view_gradient, arangement_gradient
+            ):
+                if clip_clr_ele is not None:
+                    clip_clr_ele.set("Value", color_tools.color_index_strs[sub_ind])
+                if arangement_clr_ele is not None:
+                    arangement_clr_ele.set("Value", color_tools.color_index_strs[arangement_ind])
@@ -1,9 +1,9 @@
 """Ableton track parser."""
+import functools
 import logging
-from typing import Iterator, Tuple
-from xml.etree import ElementTree as ET
+from typing import Iterator, List, Tuple
 
-from abletoolz.misc import B, C, G, M, get_element
+from abletoolz.misc import B, C, Element, G, M, get_element
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +11,7 @@ logger = logging.getLogger(__name__)
 class AbletonTrack(object):
     """Single track object."""
 
-    def __init__(self, track_root: ET.Element, version: Tuple[int, int, int]) -> None:
+    def __init__(self, track_root: Element, version: Tuple[int, int, int]) -> None:
         """Construct AbletonTrack."""
         self.track_root = track_root
         self.type = track_root.tag
@@ -68,12 +68,12 @@ class AbletonTrack(object):
         if (clr_element := self.track_root.find(self.color_element)) is not None:
             clr_element.set("Value", str(value))
 
-    def clips_clipview(self) -> Iterator[ET.Element]:
+    def clips_clipview(self) -> Iterator[Element]:
         """Iterate through all the clips in the clip view."""
         for clip in self.track_root.iter("ClipSlot"):
             yield clip
 
-    def clips_arrangement(self) -> Iterator[ET.Element]:
+    def clips_arrangement(self) -> Iterator[Element]:
         """Iterate through all the clips in the arangement view."""
         if self.type == "MidiTrack":
             tree_element = "ClipTimeable"
@@ -84,19 +84,29 @@ class AbletonTrack(object):
         else:
             return
         clip_timeample = self.track_root.find(f".//{tree_element}")
-        if not clip_timeample:
+        if clip_timeample is None:
             return
         for arrange_clip in clip_timeample.iter(clip_element):
             yield arrange_clip
 
-    def clip_clipview_colors(self) -> Iterator[ET.Element]:
+    def clip_clipview_colors(self) -> Iterator[Element]:
         """Yield clipview color elements from current track."""
         for clip in self.clips_clipview():
             if (color_element := clip.find(f".//{self.color_element}")) is not None:
                 yield color_element
 
-    def clip_arangement_colors(self) -> Iterator[ET.Element]:
+    def clip_arangement_colors(self) -> Iterator[Element]:
         """Yield arrangement color elements from current track."""
         for clip in self.clips_arrangement():
             if (color_element := clip.find(f".//{self.color_element}")) is not None:
                 yield color_element
+
+    @functools.cached_property
+    def clipview_color_elements(self) -> List[Element]:
+        """Clipview color elements, collected once since clips are never added or removed from a parsed track."""
+        return list(self.clip_clipview_colors())
+
+    @functools.cached_property
+    def arrangement_color_elements(self) -> List[Element]:
+        """Arrangement color elements, collected once since clips are never added or removed from a parsed track."""
+        return list(self.clip_arangement_colors())
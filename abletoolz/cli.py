@@ -1,6 +1,7 @@
 """Cli entry point."""
 
 import argparse
+import concurrent.futures
 import copy
 import datetime
 import logging
@@ -9,10 +10,10 @@ import pathlib
 import sys
 import time
 import traceback
-from typing import Dict, List, Optional
+from typing import List, Optional
 
 from abletoolz import __version__
-from abletoolz.ableton_set import AbletonSet
+from abletoolz.ableton_set import MAX_PENDING_WRITES, AbletonSet
 from abletoolz.misc import BACKUP_DIR, CB, B, C, ElementNotFound, M, R, Y
 from abletoolz.sample_databaser import create_db
 
@@ -225,8 +226,13 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def process_set(args: argparse.Namespace, pathlib_obj: pathlib.Path, db: Optional[Dict]) -> int:
-    """Process individual set."""
+def process_set(
+    args: argparse.Namespace,
+    pathlib_obj: pathlib.Path,
+    db: Optional[create_db.SampleIndex],
+    save_futures: List["concurrent.futures.Future[None]"],
+) -> int:
+    """Process individual set, writes of saved sets still in progress are added to save_futures."""
     logger.info("%sParsing: %s", C, pathlib_obj)
     ableton_set = AbletonSet(pathlib_obj)
     if not ableton_set.parse():
@@ -275,7 +281,9 @@ def process_set(args: argparse.Namespace, pathlib_obj: pathlib.Path, db: Optiona
         # if backup == ableton_set:
         #     logger.info("%sSet has no changes from originally, not saving...", MB)
         #     return 0
-        ableton_set.save_set(append_bars_bpm=args.append_bars_bpm, prepend_version=args.prepend_version)
+        save_futures.append(
+            ableton_set.save_set(append_bars_bpm=args.append_bars_bpm, prepend_version=args.prepend_version)
+        )
     elif any(
         [
             args.append_bars_bpm,
@@ -312,7 +320,7 @@ def process(args: argparse.Namespace) -> int:
     db = None
     if args.fix_samples_collect or args.fix_samples_absolute:
         logger.info("%sLoading db...", M)
-        db = create_db.load_db()
+        db = create_db.SampleIndex(create_db.load_db())
 
     start_time = time.time()
     pathlib_objects = get_pathlib_objects(srcs=args.srcs)
@@ -320,12 +328,21 @@ def process(args: argparse.Namespace) -> int:
         logger.info("%sError, no sets to process!", R)
         return -1
 
+    save_futures: List["concurrent.futures.Future[None]"] = []
     for pathlib_obj in pathlib_objects:
         try:
-            process_set(args, pathlib_obj, db)
+            process_set(args, pathlib_obj, db, save_futures)
         except ElementNotFound:
             logger.info(traceback.format_exc())
+        # Parsing usually outpaces compressing, hold off on the next set rather than queue up sets in memory.
+        pending_writes = [future for future in save_futures if not future.done()]
+        if len(pending_writes) > MAX_PENDING_WRITES:
+            concurrent.futures.wait(pending_writes[:-MAX_PENDING_WRITES])
         logger.info("%s\n\n%s\n\n", M, "^" * os.get_terminal_size().columns)
+    # Sets are written in the background while the next ones are processed, wait for all of them to finish.
+    for future in save_futures:
+        if (error := future.exception()) is not None:
+            logger.error("%sFailed to save set: %s", R, error)
     logger.info(
         "%sTook %s to process %s set(s)", CB, datetime.timedelta(seconds=time.time() - start_time), len(pathlib_objects)
     )
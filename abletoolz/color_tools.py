@@ -1,9 +1,11 @@
 """Tools for dealing with ableton colors, creating gradients etc."""
+import functools
 import logging
 import random
-from typing import Final, List, Optional, Tuple
+from typing import Final, List, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
+import numpy.typing as npt
 from colormath.color_conversions import convert_color
 from colormath.color_objects import LabColor, sRGBColor
 
@@ -20,6 +22,8 @@ ableton_colors_strs: Final = [
 # yapf: enable
 ableton_colors = [int(x.strip("#"), 16) for x in ableton_colors_strs]
 colors_indexed = [(i, x) for i, x in enumerate(ableton_colors)]
+# Color indexes as the strings written to ClipColor/Color Value attributes.
+color_index_strs: Final = tuple(str(i) for i in range(len(ableton_colors)))
 # TODO: Build up this list with good results to re-use.
 known_good_combos = {
     "light_blue_to_dark_pink": (0x5DFFE9, 0xE552A1),
@@ -61,8 +65,36 @@ def hex_to_lab_color(hex_value: int) -> LabColor:
     return lab_color
 
 
-def custom_delta_e_cie2000(color1: LabColor, color2: LabColor) -> float:
-    """Re-implementation of colormath function that is currently broken due to using deprecated numpy methods."""
+class LabArray(NamedTuple):
+    """Lab values of several colors, usable in place of a LabColor to compare against all of them at once."""
+
+    lab_l: npt.NDArray[np.float64]
+    lab_a: npt.NDArray[np.float64]
+    lab_b: npt.NDArray[np.float64]
+
+
+@functools.lru_cache(maxsize=None)
+def _lab_color(hex_value: int) -> LabColor:
+    """Cached hex_to_lab_color, palette colors get converted over and over while building gradients."""
+    return hex_to_lab_color(hex_value)
+
+
+@functools.lru_cache(maxsize=None)
+def _lab_array(colors: Tuple[int, ...]) -> LabArray:
+    """Convert colors to a LabArray."""
+    lab_colors = [_lab_color(color) for color in colors]
+    return LabArray(
+        np.array([c.lab_l for c in lab_colors]),
+        np.array([c.lab_a for c in lab_colors]),
+        np.array([c.lab_b for c in lab_colors]),
+    )
+
+
+def custom_delta_e_cie2000(color1: LabColor, color2: Union[LabColor, LabArray]) -> npt.ArrayLike:
+    """Re-implementation of colormath function that is currently broken due to using deprecated numpy methods.
+
+    color2 can be a LabArray, in which case an array of distances to each of its colors is returned.
+    """
     c_1 = np.sqrt(color1.lab_a**2 + color1.lab_b**2)
     c_2 = np.sqrt(color2.lab_a**2 + color2.lab_b**2)
 
@@ -124,16 +156,14 @@ def custom_delta_e_cie2000(color1: LabColor, color2: LabColor) -> float:
 
 def find_closest_color_ciede2000(color: int, palette: List[Tuple[int, int]]) -> Tuple[int, int]:
     """Find closest color using ciede2000."""
-    lab_color = hex_to_lab_color(color)
-    closest_color = min(palette, key=lambda x: custom_delta_e_cie2000(lab_color, hex_to_lab_color(x[1])))
-    return closest_color
+    distances = custom_delta_e_cie2000(_lab_color(color), _lab_array(tuple(x[1] for x in palette)))
+    return palette[int(np.argmin(distances))]
 
 
 def find_furthest_color_ciede2000(color: int, palette: List[Tuple[int, int]]) -> Tuple[int, int]:
     """Find furthest color using ciede2000."""
-    lab_color = hex_to_lab_color(color)
-    furthest_color = max(palette, key=lambda x: custom_delta_e_cie2000(lab_color, hex_to_lab_color(x[1])))
-    return furthest_color
+    distances = custom_delta_e_cie2000(_lab_color(color), _lab_array(tuple(x[1] for x in palette)))
+    return palette[int(np.argmax(distances))]
 
 
 def create_gradient_from_palette_ciede2000(
@@ -176,7 +206,12 @@ def create_gradient_ableton(
         color_1 = ableton_colors[starting_index]
     else:
         color_1 = starting_color if starting_color is not None else random.sample(ableton_colors, 1)[0]
+    return list(_gradient_ableton(color_1, num_items))
+
 
+@functools.lru_cache(maxsize=None)
+def _gradient_ableton(color_1: int, num_items: int) -> Tuple[int, ...]:
+    """Gradient color indexes from color_1, cached since tracks and clips ask for the same ones repeatedly."""
     color_2 = find_furthest_color_ciede2000(color_1, colors_indexed)[1]
     natural_grad = create_gradient_from_palette_ciede2000(color_1, color_2, num_items, ableton_colors)
-    return [c[0] for c in natural_grad]
+    return tuple(c[0] for c in natural_grad)
@@ -1,11 +1,28 @@
 """Define root level vars and functions."""
 
+import functools
+import operator
 import pathlib
 import sys
-from typing import Dict, Literal, Optional, Tuple, Union, overload
-from xml.etree import ElementTree as ET
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Literal, Optional, Tuple, Union, overload
 
 import colorama
+import numpy as np
+import numpy.typing as npt
+
+try:
+    from lxml import etree as ET
+
+    LXML = True
+except ImportError:  # lxml is optional, the standard library parser works the same just slower.
+    from xml.etree import ElementTree as ET  # type: ignore[no-redef]
+
+    LXML = False
+
+if TYPE_CHECKING:  # Both parsers' elements share the api used here, type check against the standard library's.
+    from xml.etree.ElementTree import Element
+else:
+    Element = ET._Element if LXML else ET.Element
 
 colorama.init(autoreset=True)
 
@@ -21,48 +38,57 @@ ableton_colors = [
 ]
 
 
-STEREO_OUTPUTS: Dict[int, Dict[str, str]] = {
-    1: {"target": "AudioOut/External/S0",  "lower_display_string": "1/2"},
-    2: {"target": "AudioOut/External/S1", "lower_display_string": "3/4"},
-    3: {"target": "AudioOut/External/S2", "lower_display_string": "5/6"},
-    4: {"target": "AudioOut/External/S3", "lower_display_string": "7/8"},
-    5: {"target": "AudioOut/External/S4", "lower_display_string": "9/10"},
-    6: {"target": "AudioOut/External/S5", "lower_display_string": "11/12"},
-    7: {"target": "AudioOut/External/S6", "lower_display_string": "13/14"},
-    8: {"target": "AudioOut/External/S7", "lower_display_string": "15/16"},
-    9: {"target": "AudioOut/External/S8", "lower_display_string": "17/18"},
-    10: {"target": "AudioOut/External/S9","lower_display_string": "19/20"},
-}
+# (Target, LowerDisplayString) pairs, output number n is at index n - 1.
+STEREO_OUTPUTS: Tuple[Tuple[str, str], ...] = tuple(
+    (f"AudioOut/External/S{i}", f"{2 * i + 1}/{2 * i + 2}") for i in range(10)
+)
 # yapf: enable
 # fmt: on
 
 
+def stereo_target(output_number: int) -> str:
+    """Routing target for a stereo output number, 1 is outputs 1/2."""
+    return STEREO_OUTPUTS[output_number - 1][0]
+
+
+def stereo_display(output_number: int) -> str:
+    """Display string for a stereo output number, "3/4" for 2."""
+    return STEREO_OUTPUTS[output_number - 1][1]
+
+
 # Shorten color variables
 RST = colorama.Fore.RESET
-if sys.platform == "win32":
-    BOLD = "[1m"  # pylint: disable=invalid-character-esc
-    # Windows terminal colors are hard to see, use bright.
-    R = colorama.Fore.LIGHTRED_EX
-    G = colorama.Fore.LIGHTGREEN_EX
-    B = colorama.Fore.LIGHTBLUE_EX
-    Y = colorama.Fore.LIGHTYELLOW_EX
-    C = colorama.Fore.LIGHTCYAN_EX
-    M = colorama.Fore.LIGHTMAGENTA_EX
+BOLD = "\033[1m"
+if sys.platform == "win32":  # Windows terminal colors are hard to see, use bright.
+    R, G, B, Y, C, M = (
+        colorama.Fore.LIGHTRED_EX,
+        colorama.Fore.LIGHTGREEN_EX,
+        colorama.Fore.LIGHTBLUE_EX,
+        colorama.Fore.LIGHTYELLOW_EX,
+        colorama.Fore.LIGHTCYAN_EX,
+        colorama.Fore.LIGHTMAGENTA_EX,
+    )
 else:
-    BOLD = "\033[1m"
-    R = colorama.Fore.RED
-    G = colorama.Fore.GREEN
-    B = colorama.Fore.BLUE
-    Y = colorama.Fore.YELLOW
-    C = colorama.Fore.CYAN
-    M = colorama.Fore.MAGENTA
-
-RB = R + colorama.Style.BRIGHT + BOLD
-GB = G + colorama.Style.BRIGHT + BOLD
-BB = B + colorama.Style.BRIGHT + BOLD
-YB = Y + colorama.Style.BRIGHT + BOLD
-CB = C + colorama.Style.BRIGHT + BOLD
-MB = M + colorama.Style.BRIGHT + BOLD
+    R, G, B, Y, C, M = (
+        colorama.Fore.RED,
+        colorama.Fore.GREEN,
+        colorama.Fore.BLUE,
+        colorama.Fore.YELLOW,
+        colorama.Fore.CYAN,
+        colorama.Fore.MAGENTA,
+    )
+
+_BRIGHT = colorama.Style.BRIGHT + BOLD
+RB, GB, BB, YB, CB, MB = (color + _BRIGHT for color in (R, G, B, Y, C, M))
+
+# Prejoined get_element error message parts.
+_NOT_FOUND_PREFIX = f"{R}No element for path ["
+_NOT_FOUND_SUFFIX = f"]{RST}"
+
+NOTES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+# Note name and octave for every midi note number.
+NOTE_TABLE: Tuple[Tuple[str, int], ...] = tuple((NOTES[n % 12], n // 12 - 1) for n in range(128))
+NOTE_NAMES = np.array(NOTES)
 
 DEFAULT_DB_PATH = pathlib.Path.home() / "abletoolz_db.json"
 BACKUP_DIR = "abletoolz_backup"
@@ -76,31 +102,44 @@ class ElementNotFound(Exception):
     """Element doesnt exist within the xml hierarchy where expected."""
 
 
+@functools.lru_cache(maxsize=512)
+def _compile_path(attribute_path: str) -> Callable[[Element], Optional[Element]]:
+    """Compile dotted attribute path once, callers only use a handful of distinct paths.
+
+    The returned function stops at the first match instead of collecting all of them.
+    """
+    path = "./" + attribute_path.replace(".", "/")
+    if LXML:
+        xpath = ET.XPath(f"({path})[1]")
+        return lambda root: next(iter(xpath(root)), None)
+    return operator.methodcaller("find", path)
+
+
 @overload
 def get_element(
-    root: ET.Element,
+    root: Element,
     attribute_path: str,
     *,
-    silent_error: Literal[False],
+    silent_error: Literal[False] = False,
     attribute: Literal[None] = None,
-) -> ET.Element:
+) -> Element:
     ...
 
 
 @overload
 def get_element(
-    root: ET.Element,
+    root: Element,
     attribute_path: str,
     *,
     silent_error: Literal[True],
     attribute: Literal[None] = None,
-) -> Optional[ET.Element]:
+) -> Optional[Element]:
     ...
 
 
 @overload
 def get_element(
-    root: ET.Element,
+    root: Element,
     attribute_path: str,
     *,
     silent_error: Literal[False] = False,
@@ -109,31 +148,62 @@ def get_element(
     ...
 
 
+@overload
 def get_element(
-    root: ET.Element,
+    root: Element,
+    attribute_path: str,
+    *,
+    silent_error: Literal[True],
+    attribute: str,
+) -> Optional[str]:
+    ...
+
+
+def get_element(
+    root: Element,
     attribute_path: str,
     *,
     silent_error: bool = False,
     attribute: Optional[str] = None,
-) -> Union[ET.Element, str, None]:
-    """Get element using Element tree xpath syntax."""
-    element = root.findall(f"./{'/'.join(attribute_path.split('.'))}")
-    if not element:
+) -> Union[Element, str, None]:
+    """Get element using Element tree xpath syntax.
+
+    With silent_error a missing element returns None instead of raising ElementNotFound, so probing for optional
+    elements never builds an error message.
+    """
+    element = _compile_path(attribute_path)(root)
+    if element is None:
         if silent_error:
             return None
-        # ElementTree.dump(root)
-        raise ElementNotFound(f"{R}No element for path [{attribute_path}]")
+        raise ElementNotFound(_NOT_FOUND_PREFIX + attribute_path + _NOT_FOUND_SUFFIX)
     if attribute:
-        attr = element[0].get(attribute)
+        attr = element.get(attribute)
         if attr is None:
             raise ElementNotFound(f"{R}Element {attribute}is empty!")
         return attr
-    return element[0]
+    return element
+
+
+def iter_tags(root: Element, tags: Iterable[str]) -> Iterator[Element]:
+    """Iterate over all elements matching any of tags in a single pass over the tree."""
+    if LXML:
+        return root.iter(*tags)
+    wanted = frozenset(tags)
+    return (element for element in root.iter() if element.tag in wanted)
 
 
 def note_translator(midi_note_number: int) -> Tuple[str, int]:
     """Return note and octave from midi note number."""
-    notes = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-    octave = midi_note_number // 12 - 1
-    note_index = midi_note_number % 12
-    return notes[note_index], octave
+    if 0 <= midi_note_number < len(NOTE_TABLE):
+        return NOTE_TABLE[midi_note_number]
+    # Outside the midi range, same arithmetic as the table and note_translator_batch.
+    return NOTES[midi_note_number % 12], midi_note_number // 12 - 1
+
+
+def note_translator_batch(midi_note_numbers: npt.ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """Return note and octave arrays from an array of midi note numbers.
+
+    Preferred over note_translator when the notes are already in a sequence or array.
+    """
+    midi = np.asarray(midi_note_numbers, dtype=np.int16)
+    return NOTE_NAMES[midi % 12], (midi // 12 - 1).astype(np.int8)
@@ -2,8 +2,9 @@
 
 import json
 import logging
+import os
 import pathlib
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import tqdm
 
@@ -12,27 +13,26 @@ from abletoolz.misc import DEFAULT_DB_PATH
 logger = logging.getLogger(__name__)
 
 
-def get_all_audio_files(path: pathlib.Path) -> List[pathlib.Path]:
-    """Find all supported audio files in directory."""
-    file_suffixes = [
-        "*.aiff",
-        "*.AIFF",
-        "*.aif",
-        "*.AIF",
-        "*.wav",
-        "*.WAV",
-        "*.mp3",
-        "*.MP3",
-        "*.flacc",
-        "*.FLACC",
-        "*.ogg",
-        "*.OGG",
-        "*.mp4",
-        "*.MP4",
-    ]
-    all_files: List[pathlib.Path] = []
-    for file_type in file_suffixes:
-        all_files.extend(list(path.rglob(file_type)))
+# Lowercase, file names are lowercased before matching so any case is found.
+AUDIO_FILE_SUFFIXES = (".aiff", ".aif", ".wav", ".mp3", ".flacc", ".ogg", ".mp4")
+
+
+def get_all_audio_files(path: Union[str, pathlib.Path]) -> List[os.DirEntry]:
+    """Find all supported audio files in directory.
+
+    Walks with os.scandir so each file's stat comes from its directory entry, directory symlinks are not followed
+    (same as Path.rglob).
+    """
+    all_files: List[os.DirEntry] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    all_files.extend(get_all_audio_files(entry.path))
+                elif entry.name.lower().endswith(AUDIO_FILE_SUFFIXES):
+                    all_files.append(entry)
+    except OSError:
+        logger.debug("Cannot scan %s, skipping.", path)
     return all_files
 
 
@@ -74,12 +74,14 @@ def create_or_update_db(paths: List[str], db_path: Optional[pathlib.Path] = None
         db.pop(path)
 
     for sample in tqdm.tqdm(all_files, desc="Progress"):
-        if str(sample.resolve()) in db:
+        sample_path = str(pathlib.Path(sample.path).resolve())
+        if sample_path in db:
             continue
-        db[str(sample.resolve())] = {
+        sample_stat = sample.stat()
+        db[sample_path] = {
             "name": sample.name,
-            "size": sample.stat().st_size,
-            "last_modified": sample.stat().st_mtime,
+            "size": sample_stat.st_size,
+            "last_modified": sample_stat.st_mtime,
         }
 
     # Write db!
@@ -89,9 +91,48 @@ def create_or_update_db(paths: List[str], db_path: Optional[pathlib.Path] = None
     return db_path
 
 
-def load_db() -> Dict[str, Dict[str, Dict[str, str]]]:
-    """Load db from json."""
+def load_db() -> Dict[str, Dict[str, Any]]:
+    """Load db from json, with sizes and modification times as ints to compare directly with set values."""
     if not DEFAULT_DB_PATH.exists():
         raise FileNotFoundError(f"Database {DEFAULT_DB_PATH} doesn't exist! Run --db with sample dir(s) first.")
     with DEFAULT_DB_PATH.open() as f:
-        return json.load(f)
+        db = json.load(f)
+    for smp_info in db.values():
+        for key in ("size", "last_modified"):
+            if smp_info.get(key) is not None:
+                smp_info[key] = int(smp_info[key])
+    return db
+
+
+class SampleIndex:
+    """Database entries indexed by (name, size) and (name, last modified) so matching is a dict lookup, not a scan."""
+
+    def __init__(self, db: Dict[str, Dict[str, Any]]) -> None:
+        """Index all database entries from load_db, keeping their original order."""
+        self.db = db
+        self.entries = list(db.items())
+        self.by_size: Dict[Tuple[str, int], List[int]] = {}
+        self.by_modified: Dict[Tuple[str, int], List[int]] = {}
+        for i, (_, smp_info) in enumerate(self.entries):
+            name = smp_info.get("name")
+            if name is None:  # Can never match a set's sample name.
+                continue
+            if smp_info.get("size") is not None:
+                self.by_size.setdefault((name, smp_info["size"]), []).append(i)
+            if smp_info.get("last_modified") is not None:
+                self.by_modified.setdefault((name, smp_info["last_modified"]), []).append(i)
+
+    def matches(self, name: str, size: Optional[int], last_modified: Optional[int]) -> Iterator[Tuple[str, Dict]]:
+        """Yield (path, info) of entries matching name and either size or last modified time, in database order.
+
+        size is not always stored in ableton sets unfortunately, but we do usually have last_modified.
+        This is not perfect, but the probability of a file name matching and it's last modification time
+        matching and being a false positive are quite low.
+        """
+        found: Set[int] = set()
+        if size:
+            found.update(self.by_size.get((name, size), ()))
+        if last_modified:
+            found.update(self.by_modified.get((name, last_modified), ()))
+        for i in sorted(found):
+            yield self.entries[i]
@@ -1,18 +1,52 @@
 """Random util functions."""
+import concurrent.futures
+import ctypes
+import ctypes.util
 import datetime
+import functools
 import logging
 import os
 import pathlib
-from typing import Optional, Tuple
-from xml.etree import ElementTree as ET
+import re
+import shutil
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import pydantic
 
 from abletoolz import decode_encode
-from abletoolz.misc import BACKUP_DIR, B, ElementNotFound, R, Y, get_element
+from abletoolz.misc import BACKUP_DIR, ET, B, Element, ElementNotFound, R, Y, get_element
 
 logger = logging.getLogger(__name__)
 
+# Stat calls release the GIL, enough threads to hide the latency of slow disks and network shares.
+STAT_WORKERS = 32
+# Copies are bound by disk throughput rather than latency, fewer threads avoid thrashing a single drive.
+COPY_WORKERS = 8
+
+# From macOS sys/attr.h, for setting file creation time with setattrlist.
+ATTR_BIT_MAP_COUNT = 5
+ATTR_CMN_CRTIME = 0x00000200
+
+
+class _AttrList(ctypes.Structure):
+    """macOS struct attrlist."""
+
+    _fields_ = [
+        ("bitmapcount", ctypes.c_ushort),
+        ("reserved", ctypes.c_uint16),
+        ("commonattr", ctypes.c_uint32),
+        ("volattr", ctypes.c_uint32),
+        ("dirattr", ctypes.c_uint32),
+        ("fileattr", ctypes.c_uint32),
+        ("forkattr", ctypes.c_uint32),
+    ]
+
+
+class _Timespec(ctypes.Structure):
+    """C struct timespec."""
+
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
 
 def format_date(timestamp: float) -> str:
     """Return easy to read date."""
@@ -23,22 +57,98 @@ def create_backup(pathlib_obj: pathlib.Path) -> None:
     """Move file to backup directory, does not replace previous files moved there."""
     backup_dir = pathlib_obj.parent / BACKUP_DIR
     backup_dir.mkdir(parents=True, exist_ok=True)
-    ending_int = 1
-    while True:
-        backup_path = backup_dir / (pathlib_obj.stem + "__" + str(ending_int) + pathlib_obj.suffix)
-        if pathlib.Path(backup_path).exists():
-            ending_int += 1
-        else:
-            logger.info(
-                "%sMoving original file to backup directory:\n%s --> %s",
-                B,
-                pathlib_obj,
-                backup_path,
-            )
-            # Rename creates a new pathlib object with the new path,
-            # so pathlib_obj will still point to the original path when the file is saved.
-            pathlib_obj.rename(backup_path)
-            return
+    # List the backups once instead of checking each number. Ignore case since Windows and MacOS file systems do.
+    backup_re = re.compile(rf"{re.escape(pathlib_obj.stem)}__(\d+){re.escape(pathlib_obj.suffix)}", re.IGNORECASE)
+    matches = (backup_re.fullmatch(name) for name in os.listdir(backup_dir))
+    ending_int = max((int(m.group(1)) for m in matches if m), default=0) + 1
+    backup_path = backup_dir / (pathlib_obj.stem + "__" + str(ending_int) + pathlib_obj.suffix)
+    logger.info(
+        "%sMoving original file to backup directory:\n%s --> %s",
+        B,
+        pathlib_obj,
+        backup_path,
+    )
+    # Rename creates a new pathlib object with the new path,
+    # so pathlib_obj will still point to the original path when the file is saved.
+    pathlib_obj.rename(backup_path)
+
+
+@functools.lru_cache(maxsize=1)
+def _libc() -> ctypes.CDLL:
+    """Load libc once, declaring setattrlist's signature so its size_t and unsigned long arguments pass at full width."""
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    libc.setattrlist.argtypes = [ctypes.c_char_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_ulong]
+    libc.setattrlist.restype = ctypes.c_int
+    return libc
+
+
+def set_mac_creation_time(path: pathlib.Path, creation_time: float) -> bool:
+    """Set file creation time on macOS with setattrlist, instead of spawning SetFile.
+
+    Returns:
+        False if it couldn't be set, so the caller can fall back to SetFile.
+    """
+    attr_list = _AttrList(bitmapcount=ATTR_BIT_MAP_COUNT, commonattr=ATTR_CMN_CRTIME)
+    seconds = int(creation_time)
+    timespec = _Timespec(seconds, int((creation_time - seconds) * 1_000_000_000))
+    try:
+        result = _libc().setattrlist(
+            os.fsencode(path), ctypes.byref(attr_list), ctypes.byref(timespec), ctypes.sizeof(timespec), 0
+        )
+    except (OSError, AttributeError) as e:
+        logger.debug("Couldn't call setattrlist: %s", e)
+        return False
+    if result != 0:
+        logger.debug("setattrlist failed for %s: %s", path, os.strerror(ctypes.get_errno()))
+        return False
+    return True
+
+
+def stat_or_none(path: Optional[Union[str, pathlib.Path]]) -> Optional[os.stat_result]:
+    """Stat path, returning None if there is no path or nothing exists there. One syscall instead of exists + stat."""
+    if path is None:
+        return None
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def paths_exist(paths: Sequence[Optional[pathlib.Path]]) -> List[bool]:
+    """Check if each path exists, statting them concurrently. None paths never exist.
+
+    Sets reference the same samples many times (drum racks etc), each unique path is only statted once.
+    """
+    unique_paths = list(dict.fromkeys(paths))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+        found = {path: stat is not None for path, stat in zip(unique_paths, executor.map(stat_or_none, unique_paths))}
+    return [found[path] for path in paths]
+
+
+def walk_matching(root: Union[str, pathlib.Path], suffixes: Tuple[str, ...]) -> Iterator[os.DirEntry]:
+    """Yield entries under root with names ending in one of suffixes, like Path.rglob without a Path per entry.
+
+    Matches in a folder come before those in its sub folders and folder symlinks aren't followed, same as rglob.
+    Suffixes are lowercase and match names of any case, like rglob on Windows.
+    """
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.lower().endswith(suffixes):
+            yield entry
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_matching(entry.path, suffixes)
+
+
+def copy_files(copies: Dict[str, pathlib.Path]) -> None:
+    """Copy files concurrently, copies maps each destination to its source."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        # Consume the results so any copy error is raised here.
+        list(executor.map(shutil.copyfile, copies.values(), copies.keys()))
 
 
 def parse_mac_data(byte_data: bytes, abs_hash_path: str, debug: bool = False) -> Optional[str]:
@@ -94,29 +204,34 @@ def parse_windows_data(byte_data: bytes, abs_hash_path: str) -> Optional[str]:
     return None
 
 
+@functools.lru_cache(maxsize=4096)
+def decode_hex_path(text: str) -> Tuple[bool, Optional[str]]:
+    """Decode raw hex path data. Cached since sets reference the same samples and plugins many times.
+
+    Returns:
+        whether the data is from a MacOS set, and the parsed path or None.
+    """
+    byte_data = bytes.fromhex(text)  # Skips the new lines and tabs inside the raw text.
+    if byte_data[0:3] == b"\x00" * 3:  # Header only on mac projects.
+        return True, parse_mac_data(byte_data, text)
+    return False, parse_windows_data(byte_data, text)
+
+
 def parse_hex_path(text: str) -> Optional[str]:
     """Take raw hex string from XML entry and parses."""
     if not text:
         return None
-    # Strip new lines and tabs from raw text to have one long hex string.
-    abs_hash_path = text.replace("\t", "").replace("\n", "")
-    byte_data = bytearray.fromhex(abs_hash_path)
-    if byte_data[0:3] == b"\x00" * 3:  # Header only on mac projects.
-        # self.set_os = SetOperatingSystem.MAC_OS
-        return parse_mac_data(byte_data, abs_hash_path)
-    else:
-        # self.set_os = SetOperatingSystem.WINDOWS_OS
-        return parse_windows_data(byte_data, abs_hash_path)
+    return decode_hex_path(text)[1]
 
 
-def get_sample_size(file_ref: ET.Element) -> int:
+def get_sample_size(file_ref: Element) -> int:
     for file_size_str in ["OriginalFileSize", "FileSize"]:
-        file_size = file_ref.findall(f".//{file_size_str}")
+        file_size = file_ref.find(f".//{file_size_str}")
         # if file_size is None:
         #     raise ElementNotFound("Couldn't get sample size!")
-        if len(file_size):
+        if file_size is not None:
             try:
-                return int(file_size[0].get("Value", ""))
+                return int(file_size.get("Value", ""))
             except ValueError as exc:
                 raise ElementNotFound from exc
     logger.error("Couldn't find filesize!")
@@ -135,16 +250,17 @@ def path_separator_type(path_str: str) -> str:
 
 def check_relative_path(
     name: str,
-    sample_element: ET.Element,
+    sample_element: Element,
     project_root_folder: pathlib.Path,
 ) -> Tuple[Optional[pathlib.Path], Optional[pathlib.Path]]:
     """Constructs absolute path from project root and relative path stored in set."""
     if not project_root_folder:
         return None, None
-    relative_path_enabled = get_element(sample_element, "FileRef.HasRelativePath", attribute="Value")
-    relative_path_type = get_element(sample_element, "FileRef.RelativePathType", attribute="Value")
+    file_ref = get_element(sample_element, "FileRef")
+    relative_path_enabled = get_element(file_ref, "HasRelativePath", attribute="Value")
+    relative_path_type = get_element(file_ref, "RelativePathType", attribute="Value")
     if relative_path_enabled == "true" and relative_path_type == "3":
-        relative_path_element = get_element(sample_element, "FileRef.RelativePath")
+        relative_path_element = get_element(file_ref, "RelativePath")
         sub_directory_path = []
         for path in relative_path_element:
             sub_directory_path.append(path.get("Dir"))
@@ -201,10 +317,10 @@ class SampleRef(pydantic.BaseModel):
     size: int
     last_modified: int
     crc: int
-    relative_type_element: ET.Element
-    sample_ref: ET.Element
-    absolute_element: ET.Element
-    relative_element: ET.Element
+    relative_type_element: Element
+    sample_ref: Element
+    absolute_element: Element
+    relative_element: Element
     version_tuple: Tuple[int, int, int]
 
     absolute: Optional[pathlib.Path] = None
@@ -219,7 +335,7 @@ class SampleRef(pydantic.BaseModel):
     @classmethod
     def from_element(
         cls,
-        sample_ref: ET.Element,
+        sample_ref: Element,
         version_tuple: Tuple[int, int, int],
         project_root_folder: pathlib.Path,
     ) -> "SampleRef":
@@ -231,25 +347,28 @@ class SampleRef(pydantic.BaseModel):
         last_modified = sample_ref.find("LastModDate").get("Value")
         file_ref = sample_ref.find("FileRef")
         file_size = get_sample_size(file_ref)
-        relative_type_element = file_ref.find("RelativePathType")
+        # One pass over the direct children instead of a find per tag, keeping the first like find does.
+        children: Dict[str, Element] = {}
+        for child in file_ref:
+            children.setdefault(child.tag, child)
+        relative_type_element = children.get("RelativePathType")
+        relative_element = children.get("RelativePath")
         if version_tuple >= (11, 0, 0):
-            absolute_element = file_ref.find("Path")
-            crc = file_ref.find("OriginalCrc").get("Value")
-            absolute = file_ref.find("Path").get("Value")
-            relative_element = file_ref.find("RelativePath")
-            relative = file_ref.find("RelativePath").get("Value")
+            absolute_element = children.get("Path")
+            crc = children.get("OriginalCrc").get("Value")
+            absolute = absolute_element.get("Value")
+            relative = relative_element.get("Value")
             name = pathlib.Path(absolute).name
         else:
-            absolute_element = file_ref.find("Data")
+            absolute_element = children.get("Data")
             absolute = parse_hex_path(absolute_element.text)
-            name = file_ref.find("Name").get("Value", "")
-            try:
-                crc = file_ref.findall(".//Crc")[0].get("Value")
-            except IndexError:
+            name = children.get("Name").get("Value", "")
+            if (crc_element := file_ref.find(".//Crc")) is not None:
+                crc = crc_element.get("Value")
+            else:
                 crc = 0
-                ET.dump(file_ref)
+                logger.debug("%sNo Crc found for sample %s", Y, name)
             relative, _ = check_relative_path(name, sample_ref, project_root_folder)
-            relative_element = file_ref.find("RelativePath")
 
         return cls(
             name=name,
@@ -274,7 +393,11 @@ class SampleRef(pydantic.BaseModel):
     def relative_exists(self) -> bool:
         return self.relative and self.project_root and (self.project_root / self.relative).exists()
 
-    def get_original_file_ref(self) -> ET.Element:
+    @property
+    def relative_full_path(self) -> Optional[pathlib.Path]:
+        return self.project_root / self.relative if self.relative and self.project_root else None
+
+    def get_original_file_ref(self) -> Element:
         return get_element(self.sample_ref, "SourceContext.SourceContext.OriginalFileRef.FileRef")
 
     def set_absolute(self, path: pathlib.Path) -> None:
@@ -319,7 +442,7 @@ class SampleRef(pydantic.BaseModel):
             for e in old:
                 self.relative_element.remove(e)
             for i, folder in enumerate(path.split("/")[:-1]):
-                element = ET.Element("RelativePathElement", attrib=dict(Id=i, Dir=folder))
+                element = ET.Element("RelativePathElement", attrib=dict(Id=str(i), Dir=folder))
                 element.tail = tails[i]
                 self.relative_element.append(element)
             return